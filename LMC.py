@@ -1,6 +1,8 @@
 import numpy as np
 import warnings
 import scipy.optimize as op
+from   functools import lru_cache
+from   numba import njit
 
 pi = np.pi
 
@@ -19,6 +21,7 @@ def H(p, normalize_output=True):
     ----------
     p : array-like
         vector of probabilities; will be normalized if not done so already
+        (multi-dimensional input is flattened)
     normalize_output: bool
         boolean flag to normalize output to range (0,1); default=True
 
@@ -26,6 +29,8 @@ def H(p, normalize_output=True):
     -------
     Hout : Shannon information
     """
+    p = np.asarray(p, dtype=np.float64).ravel()
+    
     # check probabilities normalization
     if np.isclose(np.sum(p),1.0) != True:
         warnings.warn('Input probability vector was not normalized...fixing automatically')
@@ -39,7 +44,7 @@ def H(p, normalize_output=True):
     else:
         K = 1.0
 
-    return -K*np.sum(p*np.log(p))
+    return K*_H(p)
 
 
 
@@ -49,6 +54,7 @@ def D(p, normalize_output=True):
 
     p : array-like
         vector of probabilities; will be normalized if not done so already
+        (multi-dimensional input is flattened)
     normalize_output: bool
         boolean flag to normalize output to range (0,1); default=True
 
@@ -56,6 +62,8 @@ def D(p, normalize_output=True):
     -------
     Dout : Disequilibrium
     """
+    p = np.asarray(p, dtype=np.float64).ravel()
+    
     # check probabilities normalization
     if np.isclose(np.sum(p),1.0) != True:
         warnings.warn('Input probability vector was not normalized...fixing automatically')
@@ -69,7 +77,7 @@ def D(p, normalize_output=True):
     else:
         K = 1.0
     
-    return K*np.sum((p-1/N)**2)
+    return K*_D(p)
 
 
 
@@ -79,6 +87,7 @@ def C(p, normalize_output=True):
 
     p : array-like
         vector of probabilities; will be normalized if not done so already
+        (multi-dimensional input is flattened)
     normalize_output: bool
         boolean flag to normalize output to range (0,1); default=True
 
@@ -86,6 +95,8 @@ def C(p, normalize_output=True):
     -------
     Cout : LMC Complexity
     """
+    p = np.asarray(p, dtype=np.float64).ravel()
+    
     # check probabilities normalization
     if np.isclose(np.sum(p),1.0) != True:
         warnings.warn('Input probability vector was not normalized...fixing automatically')
@@ -100,7 +111,54 @@ def C(p, normalize_output=True):
     else:
         K = 1.0
 
-    return K * H(p, False)*D(p, False)
+    return K * _H(p)*_D(p)
+
+
+
+@njit(cache=True)
+def _H(p):
+    """
+    Compiled kernel for H; unnormalized Shannon information of a normalized probability vector
+    """
+    Hout = 0.0
+    for i in range(len(p)):
+        Hout -= p[i]*np.log(p[i])
+    
+    return Hout
+
+
+
+@njit(cache=True)
+def _D(p):
+    """
+    Compiled kernel for D; unnormalized disequilibrium of a normalized probability vector
+    """
+    N = len(p)
+    
+    Dout = 0.0
+    for i in range(N):
+        Dout += (p[i]-1/N)**2
+    
+    return Dout
+
+
+
+@njit(cache=True, error_model='numpy')
+def _D_normalized(x):
+    """
+    Compiled kernel for D; unnormalized disequilibrium of x/sum(x), in one pass over x
+    
+    Uses sum((p-1/N)**2) = sum(p**2) - 1/N for normalized p, so the normalized vector is never formed
+    """
+    N = len(x)
+    
+    s = s2 = 0.0
+    for i in range(N):
+        s  += x[i]
+        s2 += x[i]*x[i]
+    
+    # guard against round-off for (nearly) equal x
+    return max(s2/(s*s) - 1/N, 0.0)
 
 
 
@@ -139,22 +197,31 @@ def Cmax(N):
     
     Cout = np.zeros_like(N, dtype='float')
     for i, n in enumerate(N):
-        if n < 2:
-            Cout[i] = np.nan
-        else:
-            if n == 2: p0 = 0.85
-            else:      p0 = 2/3
+        Cout[i] = _Cmax(int(n))
 
-            popt9  = op.fsolve(ap9, p0, args=(n))
-            popt10 = op.fsolve(ap10, p0, args=(n)) 
+    return Cout
 
-            pall = np.zeros(n)
-            pall[0] = popt9
-            pall[1:] = (1-popt9)/(n-1)
 
-            Cout[i] = -np.sum(pall*np.log(pall))*np.sum((pall-1/n)**2)
 
-    return Cout
+@lru_cache(maxsize=None)
+def _Cmax(n):
+    """
+    Cmax for a single integer n; cached, since each call requires a root solve
+    """
+    if n < 2:
+        return np.nan
+    
+    if n == 2: p0 = 0.85
+    else:      p0 = 2/3
+
+    popt9  = op.fsolve(ap9, p0, args=(n))
+    popt10 = op.fsolve(ap10, p0, args=(n)) 
+
+    pall = np.zeros(n)
+    pall[0] = popt9[0]
+    pall[1:] = (1-popt9[0])/(n-1)
+
+    return _H(pall)*_D(pall)
 
 
 
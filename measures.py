@@ -1,8 +1,9 @@
 import numpy as np
 import warnings
 import scipy.optimize as op
-import .LMC
-from   scipy import stats
+from   scipy import sparse
+from   numba import njit, prange
+from   . import LMC
 
 pi = np.pi
 
@@ -11,11 +12,25 @@ BIGG = 6.67e-11    # Newton's constant [SI units]
 RSUN = 6.957e8     # solar radius [m]
 MSUN = 1.988e30    # Solar mass [kg]
 
+PEARTH = 365.24    # Earth orbital period [days]
+AEARTH = 215.05    # Earth semimajor axis [solar radii]
+
+G = BIGG / RSUN**3 * MSUN * (24*3600)**2    # Newton's constant [R_sun^3 * M_sun^-1 * days^-2]
+
+_G_OVER_3PI = G/(3*pi)    # recurring combination of G in the transit duration model
+
+# all fast-math flags except 'nnan' and 'ninf'; non-transiting geometries legitimately produce NaN
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+# warnings already issued; each is raised only once so that failures inside Monte Carlo loops stay cheap
+_warned = set()
+
 
 ###
 
 __all__ = ["dynamical_mass", "mass_partitioning", "monotonicity", \
-           "characteristic_spacing", "gap_complexity", "flatness"]
+           "characteristic_spacing", "gap_complexity", "flatness", "flatness_batch", \
+           "compute_all_measures"]
 
 # Functions containing relevant physics
 
@@ -35,10 +50,146 @@ def P_to_a(P, Mstar):
     a : array-like
         semi-major axis [stellar radii]
     """
-    Pearth = 365.24    # [days]
-    aearth = 215.05    # [solar radii]
+    return AEARTH * ((P/PEARTH)**2 *(1/Mstar))**(1/3)
+
+
+def a_over_Rstar(P, rho):
+    """
+    Convenience function to convert periods to scaled semimajor axis from Kepler's Law
+    
+    Parameters
+    ----------
+    P : array-like
+        orbital periods [days]
+    rho : float
+        stellar density [solar density]
+        
+    Returns
+    -------
+    aRs : array-like
+        semi-major axis [stellar radii]
+    """
+    return np.cbrt(_G_OVER_3PI*rho*P**2)
+
+
+@njit(cache=True, fastmath=_FASTMATH, error_model='numpy', inline='always')
+def _duration(P, rho, rprs, cosi2):
+    """
+    Compiled transit duration of a single planet, shared by the kernels below
+    
+    Takes cosi**2 rather than cosi, and uses term3 = P/(pi*a/Rstar) and term2b*term2c = (a/Rstar)**2 * cosi**2,
+    so that each element costs one power and one sqrt rather than three powers
+    """
+    aRs = (_G_OVER_3PI*rho*P*P)**(1/3)
+    
+    term3 = P/(pi*aRs)
+    term2 = np.sqrt((1+rprs)**2 - aRs*aRs*cosi2)
+    
+    return term3*term2
+
+
+@njit(cache=True, fastmath=_FASTMATH, error_model='numpy')
+def _duration_kernel(period, rho, rprs, cosi2, out):
+    """
+    Compiled loop behind calculate_duration; inputs are float64 arrays of length len(out)
+    """
+    for i in range(len(out)):
+        out[i] = _duration(period[i], rho[i], rprs[i], cosi2[i])
+    
+    return out
+
+
+@njit(cache=True, fastmath=_FASTMATH, error_model='numpy')
+def _residuals_kernel(period, rho, rprs, cosi2, data_dur, data_err):
+    """
+    Compiled loop behind residuals_for_duration_fit; rho and cosi2 are scalars shared by
+    every planet, the rest are float64 arrays of length len(data_dur)
+    """
+    n = len(data_dur)
+    if len(period) != n or len(rprs) != n or len(data_err) != n:
+        raise ValueError('period, rprs, data_dur, and data_err must have the same length')
+    
+    out = np.empty(n)
+    for i in range(n):
+        out[i] = (data_dur[i] - _duration(period[i], rho, rprs[i], cosi2))/data_err[i]
+    
+    return out
+
+
+def _dur_jac(cosi, x1, data_dur, data_err):
+    """
+    Analytic Jacobian of residuals_for_duration_fit with respect to cosi (op.least_squares jac)
+    
+    The model is term3*sqrt(A - B*cosi**2) with term3**2 * B = (P/pi)**2,
+    so d(residual)/d(cosi) = (P/pi)**2 * cosi / (model*data_err)
+    """
+    period, rho, rprs = x1
+    
+    model_dur = calculate_duration(period, rho, rprs, cosi)
+    
+    return ((period/pi)**2*cosi/model_dur/data_err).reshape(-1,1)
+
+
+def _batch_dur_jac(x0, x1, data_dur, data_err):
+    """
+    Analytic Jacobian of residuals_for_batch_duration_fit with respect to cosi (op.least_squares jac)
+    
+    Each residual depends only on the cosi of its own system, so the Jacobian is
+    block-diagonal and is returned as a sparse matrix with one entry per row (see _dur_jac)
+    """
+    period, rho, rprs, sys_id = x1
+    
+    cosi = x0[sys_id]
+    model_dur = calculate_duration(period, rho, rprs, cosi)
+    
+    n = len(sys_id)
+    
+    return sparse.csr_matrix(((period/pi)**2*cosi/model_dur/data_err, sys_id, np.arange(n+1)), shape=(n, len(x0)))
+
+
+def _cosi_start(period, rho, rprs, data_dur, data_err, sys_id, Nsys):
+    """
+    Starting values and upper bounds on cosi for the duration fit of each of Nsys systems
+    
+    sys_id maps each planet to its system; all other inputs are 1-D arrays over planets
+    (rho may also be a float)
+    """
+    aRs = a_over_Rstar(period, rho)
+    
+    # beyond the tightest grazing limit (1+rprs)*Rstar/a the model duration is undefined
+    cosi_max = np.full(Nsys, np.inf)
+    np.minimum.at(cosi_max, sys_id, (1+rprs)/aRs)
+    
+    # warm start from the weighted fit linearized in cosi**2, (dur/dur0)**2 = 1 - (aRs*cosi/(1+rprs))**2
+    dur0 = calculate_duration(period, rho, rprs, 0.0)
+    u = (aRs/(1+rprs))**2
+    y = 1 - (data_dur/dur0)**2
+    w = (dur0**2/(2*data_dur*data_err))**2
+    
+    cosi2 = np.maximum(np.bincount(sys_id, w*u*y, Nsys)/np.bincount(sys_id, w*u*u, Nsys), 0.0)
+    
+    # the analytic Jacobian vanishes at cosi=0, so keep the start just off zero
+    cosi = np.clip(np.sqrt(cosi2), 0.01*cosi_max, 0.99*cosi_max)
+    
+    return cosi, cosi_max
+
+
+def _as_float_arrays(*args):
+    """
+    Broadcast inputs against each other and flatten them to float64 arrays for the compiled kernels
+    
+    Returns the broadcast shape and the flat arrays, which all have the same length;
+    np.broadcast_arrays is skipped when the shapes already agree
+    """
+    arrays = [np.asarray(x, dtype=np.float64) for x in args]
     
-    return aearth * ((P/Pearth)**2 *(1/Mstar))**(1/3)
+    shape = arrays[0].shape
+    if any(x.shape != shape for x in arrays[1:]):
+        # copy, since broadcast views are flagged read-only for the kernels
+        arrays = [x.copy() for x in np.broadcast_arrays(*arrays)]
+        shape  = arrays[0].shape
+    
+    return shape, [x.ravel() for x in arrays]
 
 
 def calculate_duration(period, rho, rprs, cosi):
@@ -61,15 +212,9 @@ def calculate_duration(period, rho, rprs, cosi):
     transit_duration: array-like
         transit duration [days]
     """
-    G = BIGG / RSUN**3 * MSUN * (24*3600)**2    # Newton's constant [R_sun^3 * M_sun^-1 * days^-2]
-    
-    term3  = ((3*period)/(G*rho*pi**2))**(1/3)
-    term2a = (1+rprs)**2
-    term2b = ((G*rho)/(3*pi))**(2/3)
-    term2c = period**(4/3)*cosi**2
-    term2  = (term2a - term2b*term2c)**(1/2)
+    shape, arrays = _as_float_arrays(period, rho, rprs, np.square(cosi))
     
-    return term3*term2
+    return _duration_kernel(*arrays, np.empty(arrays[0].size)).reshape(shape)
 
 
 def residuals_for_duration_fit(x0, x1, data_dur, data_err):
@@ -82,6 +227,7 @@ def residuals_for_duration_fit(x0, x1, data_dur, data_err):
         vector of parameters to vary in fit (cosi)
     x1 : array-like
         vector of parameters to hold constant (periods, rhostar, rprs)
+        periods and rprs must be 1-D arrays matching data_dur; rhostar is a float
     data_dur : array-like
         measured transit durations [days]
     data_err : array-like
@@ -92,12 +238,102 @@ def residuals_for_duration_fit(x0, x1, data_dur, data_err):
     residuals : array-like
         error-scaled residuals on transit durations
     """
-    cosi = x0
+    # cosi and rho are scalars for a single system; square cosi once here rather than per element
+    cosi = float(x0[0])
     period, rho, rprs = x1
     
-    model_dur = calculate_duration(period, rho, rprs, cosi)
+    return _residuals_kernel(np.asarray(period, dtype=np.float64), float(rho), np.asarray(rprs, dtype=np.float64), \
+                             cosi*cosi, np.asarray(data_dur, dtype=np.float64), np.asarray(data_err, dtype=np.float64))
+
+
+def residuals_for_batch_duration_fit(x0, x1, data_dur, data_err):
+    """
+    Helper function to return residuals for a simultaneous least squares fit of many systems
+    
+    Parameters
+    ----------
+    x0 : array-like
+        vector of parameters to vary in fit (cosi for each system)
+    x1 : array-like
+        vector of parameters to hold constant (periods, rhostar, rprs, sys_id)
+        all concatenated over systems; sys_id maps each planet to its system
+    data_dur : array-like
+        measured transit durations [days]
+    data_err : array-like
+        corresponding errors [days]
+        
+    Returns
+    -------
+    residuals : array-like
+        error-scaled residuals on transit durations
+    """
+    period, rho, rprs, sys_id = x1
+    
+    return (data_dur - calculate_duration(period, rho, rprs, x0[sys_id]))/data_err
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _residual_std(data_dur, model_dur):
+    """
+    Compiled single-pass std(data-model) behind flatness_given_rms
+    """
+    n = len(data_dur)
+    
+    s = s2 = 0.0
+    for i in range(n):
+        r   = data_dur[i] - model_dur[i]
+        s  += r
+        s2 += r*r
+    
+    var = (s2 - s*s/n)/n
+    if var < 0.0:
+        var = 0.0    # guard against round-off
+    
+    return np.sqrt(var)
+
+
+def precompute_rms(data_dur):
+    """
+    Helper function to calculate the rms of the measured durations, the denominator of flatness
+    
+    When flatness is evaluated repeatedly against fixed data (e.g. over posterior draws of the
+    model durations), compute this once and pass it to flatness_given_rms
+    
+    Parameters
+    ----------
+    data_dur : array-like
+        measured transit durations [days]
+        
+    Returns
+    -------
+    rms : float
+        root-mean-square of data_dur [days]
+    """
+    data_dur = np.asarray(data_dur, dtype=np.float64).ravel()
+    
+    return np.sqrt(np.dot(data_dur, data_dur)/len(data_dur))
+
+
+def flatness_given_rms(data_dur, model_dur, rms):
+    """
+    Helper function to calculate flatness given a precomputed rms of the measured durations
     
-    return (data_dur - model_dur)/data_err
+    Parameters
+    ----------
+    data_dur : array-like
+        measured transit durations [days]
+    model_dur : array-like
+        model transit durations [days] from least squares fit
+    rms : float
+        root-mean-square of data_dur [days], from precompute_rms
+        
+    Returns
+    -------
+    flatness : float
+        flatness measure
+    """
+    return _residual_std(np.asarray(data_dur, dtype=np.float64).ravel(), \
+                         np.asarray(model_dur, dtype=np.float64).ravel())/rms
 
 
 def calculate_flatness(data_dur, model_dur):
@@ -116,7 +352,221 @@ def calculate_flatness(data_dur, model_dur):
     flatness : array-like
         flatness measure
     """
-    return np.std(data_dur-model_dur)/np.sqrt(np.mean(data_dur**2))
+    return flatness_given_rms(data_dur, model_dur, precompute_rms(data_dur))
+
+
+
+@njit(cache=True)
+def _argsort_small(x):
+    """
+    Compiled insertion argsort; for the handful of planets in a system this is
+    far cheaper than the call overhead of np.argsort
+    """
+    n = len(x)
+    idx = np.arange(n)
+    
+    for i in range(1,n):
+        k = idx[i]
+        v = x[k]
+        j = i-1
+        while j >= 0 and x[idx[j]] > v:
+            idx[j+1] = idx[j]
+            j -= 1
+        idx[j+1] = k
+    
+    return idx
+
+
+@njit(cache=True)
+def _sort_small(x):
+    """
+    Compiled insertion sort; returns a sorted copy of x
+    """
+    x = x.copy()
+    
+    for i in range(1,len(x)):
+        v = x[i]
+        j = i-1
+        while j >= 0 and x[j] > v:
+            x[j+1] = x[j]
+            j -= 1
+        x[j+1] = v
+    
+    return x
+
+
+@njit(cache=True)
+def _sort_pair_small(x, y):
+    """
+    Compiled insertion sort of x, carrying y along; returns sorted copies of both
+    """
+    x = x.copy()
+    y = y.copy()
+    
+    for i in range(1,len(x)):
+        v, w = x[i], y[i]
+        j = i-1
+        while j >= 0 and x[j] > v:
+            x[j+1] = x[j]
+            y[j+1] = y[j]
+            j -= 1
+        x[j+1] = v
+        y[j+1] = w
+    
+    return x, y
+
+
+@njit(cache=True, fastmath=_FASTMATH, error_model='numpy')
+def _mean_delta_H(periods, mp, Mstar):
+    """
+    Compiled loop behind characteristic_spacing; periods and mp must be sorted by period
+    
+    Semimajor axes are computed on the fly (as in P_to_a) so that no intermediate arrays are needed
+    """
+    n = len(periods)
+    
+    s = 0.0
+    a_in = AEARTH * ((periods[0]/PEARTH)**2 *(1/Mstar))**(1/3)
+    for i in range(n-1):
+        a_out    = AEARTH * ((periods[i+1]/PEARTH)**2 *(1/Mstar))**(1/3)
+        radius_H = ((mp[i+1]+mp[i])/(3*Mstar*MSME))**(1/3) * (a_out+a_in)/2
+        
+        s   += (a_out-a_in)/radius_H
+        a_in = a_out
+    
+    return s/(n-1)
+
+
+@njit(cache=True)
+def _rankdata(x):
+    """
+    Compiled equivalent of stats.rankdata; tied values are assigned their average rank
+    """
+    n = len(x)
+    order = _argsort_small(x)
+    ranks = np.empty(n)
+    
+    i = 0
+    while i < n:
+        j = i
+        while j+1 < n and x[order[j+1]] == x[order[i]]:
+            j += 1
+        for k in range(i,j+1):
+            ranks[order[k]] = 0.5*(i+j) + 1
+        i = j+1
+    
+    return ranks
+
+
+@njit(cache=True)
+def _ordinal_ranks(x):
+    """
+    Compiled integer ranks (0, ..., n-1) of x, and whether any values are tied
+    """
+    n = len(x)
+    order = _argsort_small(x)
+    ranks = np.empty(n, dtype=np.int64)
+    
+    ties = False
+    for i in range(n):
+        ranks[order[i]] = i
+        if i > 0 and x[order[i]] == x[order[i-1]]:
+            ties = True
+    
+    return ranks, ties
+
+
+@njit(cache=True, error_model='numpy')
+def _spearman(x, y):
+    """
+    Compiled Spearman rank correlation coefficient (no p-value)
+    """
+    n = len(x)
+    
+    rx, ties_x = _ordinal_ranks(x)
+    ry, ties_y = _ordinal_ranks(y)
+    
+    # without ties, the closed form in integer arithmetic
+    if not (ties_x or ties_y):
+        sumd2 = 0
+        for i in range(n):
+            d = rx[i] - ry[i]
+            sumd2 += d*d
+        
+        return 1.0 - 6.0*sumd2/(n*(n*n-1))
+    
+    # otherwise, the Pearson correlation of the average ranks
+    rx = _rankdata(x)
+    ry = _rankdata(y)
+    
+    mean = (n+1)/2
+    sxy = sxx = syy = 0.0
+    for i in range(n):
+        sxy += (rx[i]-mean)*(ry[i]-mean)
+        sxx += (rx[i]-mean)**2
+        syy += (ry[i]-mean)**2
+    
+    # undefined if every value of x or y is equal, as in stats.spearmanr
+    if sxx == 0.0 or syy == 0.0:
+        return np.nan
+    
+    return sxy/np.sqrt(sxx*syy)
+
+
+@njit(cache=True, error_model='numpy')
+def _mass_partitioning(masses):
+    """
+    Compiled equivalent of mass_partitioning
+    """
+    N = len(masses)
+    
+    return N/(N-1) * LMC._D_normalized(masses)
+
+
+@njit(cache=True, error_model='numpy')
+def _monotonicity(periods, masses):
+    """
+    Compiled kernel behind monotonicity
+    """
+    N = len(periods)
+    
+    rho = _spearman(periods, masses)
+    Q = _mass_partitioning(masses)
+    
+    return rho*Q**(1/N)
+
+
+@njit(cache=True, error_model='numpy')
+def _gap_complexity(P, cmax):
+    """
+    Compiled equivalent of gap_complexity; P must be sorted and cmax = LMC.Cmax(len(P)-1)
+    """
+    logP = np.log(P)
+    pp = (logP[1:] - logP[:-1])/(logP[-1] - logP[0])
+    
+    return LMC._H(pp)*LMC._D(pp)/cmax
+
+
+@njit(parallel=True, cache=True, error_model='numpy')
+def _batch(periods_flat, mp_flat, offsets, Mstar_arr, cmax, out_Q, out_M, out_S, out_C):
+    """
+    Compiled driver behind compute_all_measures; system s occupies rows offsets[s]:offsets[s+1]
+    """
+    for s in prange(len(offsets)-1):
+        lo, hi = offsets[s], offsets[s+1]
+        N = hi - lo
+        
+        out_Q[s] = out_M[s] = out_S[s] = out_C[s] = np.nan
+        
+        if N >= 2:
+            periods, mp = _sort_pair_small(periods_flat[lo:hi], mp_flat[lo:hi])
+            
+            out_Q[s] = _mass_partitioning(mp)
+            out_M[s] = _monotonicity(periods, mp)
+            out_S[s] = _mean_delta_H(periods, mp, Mstar_arr[s])
+        
+            if N >= 3:
+                out_C[s] = _gap_complexity(periods, cmax[N-1])
 
 
 
@@ -147,7 +597,10 @@ def mass_partitioning(masses):
     masses : array-like
         planet masses [any units]
     """
-    return LMC.D(masses/np.sum(masses))
+    masses = np.asarray(masses, dtype=np.float64)
+    inv = 1.0/masses.sum()
+    
+    return LMC.D(masses*inv)
 
 
 def monotonicity(periods, masses):
@@ -161,12 +614,7 @@ def monotonicity(periods, masses):
     masses : array-like
         planet masses corresponding to each given period [any units]
     """
-    N = len(periods)
-    rho = stats.spearmanr(periods, masses)[0]
-    Q = mass_partitioning(masses)
-    
-    
-    return rho*Q**(1/N)
+    return _monotonicity(np.asarray(periods, dtype=np.float64), np.asarray(masses, dtype=np.float64))
 
 
 def characteristic_spacing(periods, mp, Mstar, warn=True):
@@ -182,25 +630,18 @@ def characteristic_spacing(periods, mp, Mstar, warn=True):
     Mstar : float
         Stellar mass [M_sun]
     warn : bool (optional)
-        flag to control warnings (default=True)    
+        flag to control warnings (default=True); only the first is issued per session
     """
     if len(periods) < 2:
-        if warn:
+        if warn and 'cs_undef' not in _warned:
             warnings.warn('Characteristic spacing is undefined for S < 2; returning NaN')
+            _warned.add('cs_undef')
         return np.nan
     
     elif len(periods) >= 2:
-        order = np.argsort(periods)
+        periods, mp = _sort_pair_small(np.asarray(periods, dtype=np.float64), np.asarray(mp, dtype=np.float64))
     
-        periods = periods[order]
-        mp = mp[order]
-    
-        a = P_to_a(periods, Mstar)
-
-        radius_H = ((mp[1:]+mp[:-1])/(3*Mstar*MSME))**(1/3) * (a[1:]+a[:-1])/2
-        delta_H  = (a[1:]-a[:-1])/radius_H
-
-        return np.mean(delta_H)
+        return _mean_delta_H(periods, mp, float(Mstar))
 
 
 def gap_complexity(periods, warn=True):
@@ -212,18 +653,21 @@ def gap_complexity(periods, warn=True):
     periods : array-like
         planet periods
     warn : bool (optional)
-        flag to control warnings (default=True)
+        flag to control warnings (default=True); only the first is issued per session
     """
     if len(periods) < 3:
-        if warn:
+        if warn and 'gc_undef' not in _warned:
             warnings.warn('Complexity is undefined for N < 3; returning NaN')
+            _warned.add('gc_undef')
         return np.nan
     
     elif len(periods) >= 3:
-        order = np.argsort(periods)
-  
-        P = np.array(periods)[order]
-        pp = np.log(P[1:]/P[:-1])/np.log(P.max()/P.min())
+        # _sort_small returns a fresh copy, so take the log in place and normalize the gaps in place
+        logP = _sort_small(np.asarray(periods, dtype=np.float64))
+        np.log(logP, out=logP)
+        
+        pp  = np.diff(logP)
+        pp /= logP[-1] - logP[0]
         
         return LMC.C(pp)
     
@@ -245,11 +689,122 @@ def flatness(periods, rhostar, rprs, dur, dur_err):
     dur_err : array-like
         corresponding errors on transit durations [hours
     """
-    cosi = np.array([0.0])
+    # flatten and broadcast once, so that each residual evaluation can skip it
+    _, (periods, rprs, dur, dur_err) = _as_float_arrays(periods, rprs, dur, dur_err)
+    
+    cosi, cosi_max = _cosi_start(periods, rhostar, rprs, dur, dur_err, np.zeros(len(periods), dtype=int), 1)
     transit_params = [periods, rhostar, rprs]
+    
+    rms = precompute_rms(dur)
         
-    cosi, success = op.leastsq(residuals_for_duration_fit, cosi, args=(transit_params, dur, dur_err))
+    res = op.least_squares(residuals_for_duration_fit, x0=cosi, args=(transit_params, dur, dur_err), \
+                           jac=_dur_jac, bounds=(0.0, cosi_max), method='trf', xtol=1e-8)
+    cosi = res.x
         
     model_dur = calculate_duration(periods, rhostar, rprs, cosi)
     
-    return calculate_flatness(dur, model_dur)
+    return flatness_given_rms(dur, model_dur, rms)
+
+
+def flatness_batch(periods_list, rhostar, rprs_list, dur_list, dur_err_list):
+    """
+    Flatness, f, for many systems at once
+    
+    All systems are stacked into a single least squares problem with one cosi
+    per system and an analytic, block-diagonal sparse Jacobian, which avoids
+    the per-call overhead of fitting thousands of systems one at a time
+    
+    Parameters
+    ----------
+    periods_list : list of array-like
+        orbital periods for each system [days]
+    rhostar : float or array-like
+        stellar density for each system [solar density]
+    rprs_list : list of array-like
+        planet-to-star radius ratios corresponding to given periods
+    dur_list : list of array-like
+        transit durations corresponding to given periods [hours]
+    dur_err_list : list of array-like
+        corresponding errors on transit durations [hours]
+        
+    Returns
+    -------
+    flatness : ndarray
+        flatness measure for each system
+    """
+    Nsys = len(periods_list)
+    
+    if Nsys == 0:
+        return np.empty(0)
+    
+    # a single system gains nothing from the sparse solver (which cannot take one variable)
+    if Nsys == 1:
+        return np.array([flatness(periods_list[0], np.ravel(rhostar)[0], rprs_list[0], dur_list[0], dur_err_list[0])])
+    
+    sizes   = np.array([len(p) for p in periods_list])
+    sys_id  = np.repeat(np.arange(Nsys), sizes)
+    
+    periods = np.concatenate(periods_list).astype(float)
+    rho     = np.broadcast_to(np.asarray(rhostar, dtype=float), (Nsys,))[sys_id]
+    rprs    = np.concatenate(rprs_list).astype(float)
+    dur     = np.concatenate(dur_list).astype(float)
+    dur_err = np.concatenate(dur_err_list).astype(float)
+    
+    cosi, cosi_max = _cosi_start(periods, rho, rprs, dur, dur_err, sys_id, Nsys)
+    transit_params = [periods, rho, rprs, sys_id]
+    
+    # convergence is judged on the total cost, so scale each cosi by its own Jacobian, and solve the
+    # sparse trust-region subproblems tightly; the default lsmr tolerances leave some systems unconverged
+    res = op.least_squares(residuals_for_batch_duration_fit, x0=cosi, args=(transit_params, dur, dur_err), \
+                           jac=_batch_dur_jac, bounds=(0.0, cosi_max), method='trf', x_scale='jac', xtol=1e-8, \
+                           tr_options={'regularize': False, 'atol': 1e-10, 'btol': 1e-10})
+    
+    model_dur = calculate_duration(periods, rho, rprs, res.x[sys_id])
+    
+    split = np.cumsum(sizes)[:-1]
+    
+    return np.array([flatness_given_rms(d, m, precompute_rms(d)) for d, m in zip(np.split(dur, split), np.split(model_dur, split))])
+
+
+def compute_all_measures(periods_list, mp_list, Mstar):
+    """
+    Mass partitioning, monotonicity, characteristic spacing, and gap complexity for many systems
+    
+    Systems are processed in parallel by compiled code; measures that are undefined
+    for a system (too few planets, or degenerate inputs such as all-equal periods or
+    masses) are returned as NaN without warning, leaving the other systems unaffected.
+    Flatness requires transit data; see flatness_batch
+    
+    Parameters
+    ----------
+    periods_list : list of array-like
+        orbital periods for each system [days]
+    mp_list : list of array-like
+        planet masses corresponding to each given period [M_earth]
+    Mstar : float or array-like
+        stellar mass for each system [M_sun]
+        
+    Returns
+    -------
+    Q, M, S, C : ndarray
+        mass partitioning, monotonicity, characteristic spacing, and gap complexity for each system
+    """
+    if len(periods_list) == 0:
+        return np.empty(0), np.empty(0), np.empty(0), np.empty(0)
+    
+    sizes   = np.array([len(p) for p in periods_list])
+    Nsys    = len(sizes)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    
+    periods = np.concatenate(periods_list).astype(np.float64)
+    mp      = np.concatenate(mp_list).astype(np.float64)
+    Mstar   = np.ascontiguousarray(np.broadcast_to(np.asarray(Mstar, dtype=np.float64), (Nsys,)))
+    
+    # Cmax requires a root solve, so tabulate it once for every number of gaps present
+    cmax = LMC.Cmax(np.arange(sizes.max(initial=1)))
+    
+    Q, M, S, C = np.empty((4,Nsys))
+    
+    _batch(periods, mp, offsets, Mstar, cmax, Q, M, S, C)
+    
+    return Q, M, S, C
@@ -24,7 +24,7 @@ setup(
     url='https://github.com/gjgilbert/archinfo',
     description='Describing exoplanetary system architectures using information theory',
     long_description=long_description,
-    install_requires=['scipy', 'warnings'],
+    install_requires=['scipy', 'numba', 'warnings'],
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Science/Research',
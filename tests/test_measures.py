@@ -0,0 +1,143 @@
+import warnings
+
+import numpy as np
+import pytest
+
+import archinfo
+from archinfo import LMC, measures
+
+
+# a five-planet system; reference values were computed with the original pure-NumPy implementation
+P     = np.array([3.2, 7.9, 12.5, 25.1, 48.3])
+MP    = np.array([2.1, 5.4, 3.3, 11.0, 8.2])
+MSTAR = 0.95
+RHO   = 1.1
+RPRS  = np.array([0.012, 0.021, 0.018, 0.030, 0.025])
+DUR   = np.array([0.0683, 0.0898, 0.1087, 0.1299, 0.1513])
+ERR   = np.array([0.00205, 0.00269, 0.00326, 0.0039, 0.00454])
+
+
+def random_systems(n, seed=1):
+    rng = np.random.default_rng(seed)
+
+    systems = []
+    for _ in range(n):
+        N    = rng.integers(1, 9)
+        P    = np.exp(rng.uniform(np.log(1), np.log(300), N))
+        rho  = rng.uniform(0.5, 2.0)
+        rprs = rng.uniform(0.005, 0.05, N)
+        cosi = rng.uniform(0, 0.9)/measures.a_over_Rstar(P.max(), rho)
+        dur  = measures.calculate_duration(P, rho, rprs, cosi)*(1 + rng.normal(0, 0.05, N))
+
+        systems.append(dict(P=P, mp=np.exp(rng.uniform(np.log(0.5), np.log(300), N)), Mstar=rng.uniform(0.5, 1.3), \
+                            rho=rho, rprs=rprs, dur=dur, err=0.05*dur))
+
+    return systems
+
+
+def per_system(s):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+
+        N = len(s['P'])
+        Q = archinfo.mass_partitioning(s['mp']) if N >= 2 else np.nan
+        M = archinfo.monotonicity(s['P'], s['mp']) if N >= 2 else np.nan
+        S = archinfo.characteristic_spacing(s['P'], s['mp'], s['Mstar'])
+        C = np.squeeze(archinfo.gap_complexity(s['P']))
+
+    return Q, M, S, C
+
+
+def test_reference_values():
+    assert archinfo.mass_partitioning(MP) == pytest.approx(0.07319444444444442, rel=1e-12)
+    assert archinfo.mass_partitioning(list(MP)) == pytest.approx(0.07319444444444442, rel=1e-12)
+    assert archinfo.monotonicity(P, MP) == pytest.approx(0.47422627270901907, rel=1e-12)
+    assert archinfo.monotonicity(P, [2., 2., 3., 1., 5.]) == pytest.approx(0.2097821194669261, rel=1e-12)
+    assert archinfo.characteristic_spacing(P, MP, MSTAR) == pytest.approx(19.528652352215133, rel=1e-12)
+    assert np.squeeze(archinfo.gap_complexity(P)) == pytest.approx(0.06338371157597569, rel=1e-12)
+    assert archinfo.flatness(P, RHO, RPRS, DUR, ERR) == pytest.approx(0.015248914191966827, rel=1e-5)
+
+
+def test_degenerate_inputs():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+
+        assert np.isnan(archinfo.characteristic_spacing([5.], [1.], 1.))
+        assert np.isnan(archinfo.gap_complexity([5., 9.]))
+
+    assert np.isnan(archinfo.monotonicity([1., 2., 3.], [2., 2., 2.]))
+    assert np.isnan(archinfo.monotonicity([4., 4., 4.], [1., 2., 3.]))
+    assert archinfo.mass_partitioning([2., 2., 2.]) == pytest.approx(0.0, abs=1e-15)
+
+
+def test_lmc_flattens_input():
+    assert LMC.H(np.ones((2,2))/4) == pytest.approx(1.0)
+    assert LMC.D(np.ones((2,2))/4) == pytest.approx(0.0)
+
+
+def test_calculate_duration_broadcasts():
+    def reference(period, rho, rprs, cosi):
+        G = measures.G
+        term3 = ((3*period)/(G*rho*np.pi**2))**(1/3)
+        term2 = (1+rprs)**2 - ((G*rho)/(3*np.pi))**(2/3)*period**(4/3)*cosi**2
+        return term3*np.sqrt(term2)
+
+    cases = [(np.array([[3.],[7.]]), 1.0, np.array([.02, .03]), 0.0),
+             (np.array([3., 5., 7.]), 1.2, 0.02, np.linspace(0, 0.01, 4).reshape(-1,1)),
+             (5.0, 1.0, 0.02, 0.01)]
+
+    for case in cases:
+        out = measures.calculate_duration(*case)
+        assert out.shape == np.broadcast(*case).shape
+        assert np.allclose(out, reference(*case))
+
+    with pytest.raises(ValueError):
+        measures.calculate_duration(np.ones(3), 1.0, np.ones(2), 0.0)
+
+
+def test_compute_all_measures_matches_per_system():
+    systems = random_systems(200)
+
+    # append tied, constant, and zero inputs
+    systems += [dict(P=np.array([1., 2., 3.]), mp=np.array([2., 2., 2.]), Mstar=1.0),
+                dict(P=np.array([4., 4., 4.]), mp=np.array([1., 2., 3.]), Mstar=1.0),
+                dict(P=np.array([1., 2., 5., 9.]), mp=np.array([1., 3., 3., 2.]), Mstar=1.0),
+                dict(P=np.array([1., 2.]), mp=np.array([0., 0.]), Mstar=1.0)]
+
+    Q, M, S, C = archinfo.compute_all_measures([s['P'] for s in systems], [s['mp'] for s in systems], \
+                                               np.array([s['Mstar'] for s in systems]))
+
+    expected = np.array([per_system(s) for s in systems]).T
+
+    for out, ref in zip((Q, M, S, C), expected):
+        assert np.allclose(out, ref, rtol=1e-10, equal_nan=True)
+
+    # undefined below two planets (Q, M, S) and three planets (C)
+    sizes = np.array([len(s['P']) for s in systems])
+    assert np.all(np.isnan(Q[sizes < 2])) and np.all(np.isnan(C[sizes < 3]))
+
+
+def test_compute_all_measures_empty():
+    out = archinfo.compute_all_measures([], [], 1.0)
+
+    assert len(out) == 4 and all(len(x) == 0 for x in out)
+
+
+def test_flatness_batch_matches_flatness():
+    systems = [s for s in random_systems(100, seed=2) if len(s['P']) >= 2]
+
+    f = archinfo.flatness_batch([s['P'] for s in systems], np.array([s['rho'] for s in systems]), \
+                                [s['rprs'] for s in systems], [s['dur'] for s in systems], [s['err'] for s in systems])
+
+    expected = [archinfo.flatness(s['P'], s['rho'], s['rprs'], s['dur'], s['err']) for s in systems]
+
+    assert np.allclose(f, expected, rtol=1e-5)
+
+
+def test_flatness_batch_small():
+    f = archinfo.flatness_batch([P], RHO, [RPRS], [DUR], [ERR])
+
+    assert f.shape == (1,)
+    assert f[0] == pytest.approx(archinfo.flatness(P, RHO, RPRS, DUR, ERR))
+
+    assert len(archinfo.flatness_batch([], RHO, [], [], [])) == 0